@@ -1,204 +1,434 @@
+"""Fill talis_installed in newDatas.json from the talis install dates in SLA DES 2025.xlsx.
+
+Run from this directory: python update_talis_installed.py [--jobs N]
+
+Requires pandas, openpyxl, orjson and rapidfuzz:
+
+    pip install pandas openpyxl orjson rapidfuzz
+
+python-calamine is optional; when installed it is used instead of openpyxl
+to parse the workbook, which is several times faster.
+"""
+import argparse
 import pandas as pd
-import json
-from datetime import datetime
+from pandas.api.types import is_datetime64_any_dtype
+import glob
+import hashlib
+import orjson
+import os
+import pickle
+from datetime import date, datetime
 import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from rapidfuzz import fuzz, process, utils
 
-# Read Excel file - check the SLA sheet
-excel_file = 'SLA DES 2025.xlsx'
+# The Rust-based calamine reader is several times faster than openpyxl;
+# fall back to openpyxl when python-calamine isn't installed
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
 
-# Read from SLA sheet with header at row 2 (0-indexed: row 2 = index 2)
-df = pd.read_excel(excel_file, sheet_name='SLA', header=2)
+# Pickle cache files written by read_workbook are named <prefix><md5>.pkl
+CACHE_PREFIX = 'update_talis_installed-'
 
-print("Columns found:")
-print(df.columns.tolist())
+# Sheets read from the workbook and the 0-indexed row holding each one's header
+SHEET_HEADERS = {'SLA': 2, 'Talis Full': 1, 'Talis Mix': 1}
 
-# Find the columns
-talis_col = None
-site_name_col = None
+# Cell values treated as empty once stringified and lowercased
+SENTINELS = frozenset({'nan', 'none', ''})
 
-for col in df.columns:
-    col_str = str(col).lower().replace('\n', ' ').replace('\r', ' ')
-    if 'done instal' in col_str and 'talis' in col_str:
-        talis_col = col
-    if 'nama site' in col_str or ('site' in col_str and 'name' in col_str):
-        site_name_col = col
+# Site-name variations matched as equal: underscores and spaces become hyphens
+NORM_TABLE = str.maketrans({'_': '-', ' ': '-'})
 
-print(f"\nTalis column: {talis_col}")
-print(f"Site name column: {site_name_col}")
+# Minimum token_sort_ratio for a fuzzy site-name candidate; site numbers must
+# also agree so e.g. "kampung-baru-1" never takes "kampung-baru-2"'s date
+FUZZY_CUTOFF = 90
+# Names shorter than this (after processing) need the stricter cutoff: one
+# stray character is a small share of a short name (menarbux ~ menarbu: 93)
+FUZZY_SHORT_LEN = 10
+FUZZY_SHORT_CUTOFF = 95
+# The best candidate must beat the runner-up by this many points
+FUZZY_MARGIN = 5
+# Only candidates at this score (same tokens, differing in order or
+# punctuation) are written to the JSON; a one-letter difference can be a
+# different village ("kampung baru" / "kampung biru"), so anything lower is
+# only printed for review
+FUZZY_APPLY_SCORE = 100
+DIGITS_RX = re.compile(r'\d+')
 
-if not talis_col or not site_name_col:
-    print("\nTrying other sheets...")
-    # Try Talis Full and Talis Mix sheets
-    for sheet_name in ['Talis Full', 'Talis Mix']:
+# Column headers (newlines collapsed, lowercased) holding the talis date and site name
+NEWLINE_RX = re.compile(r'[\r\n]+')
+TALIS_COL_RX = re.compile(r'done instal.*talis|talis.*done instal')
+SITE_COL_RX = re.compile(r'nama site|site.*name|name.*site')
+
+# ISO dates, zero-padded or not ("2025-10-06", "2025-1-5")
+ISO_PREFIX_RX = re.compile(r'\d{4}-')
+
+# Free-form dates like "6 sept 2025"
+DATE_RX = re.compile(r'(\d{1,2})\s+([a-zA-Z]+)\s+(\d{4})', re.IGNORECASE)
+MONTH_MAP = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+    'januari': 1, 'februari': 2, 'maret': 3, 'april': 4, 'mei': 5, 'juni': 6,
+    'juli': 7, 'agustus': 8, 'september': 9, 'oktober': 10, 'november': 11, 'desember': 12
+}
+
+
+def normalize_name(site_name: str) -> str:
+    """Collapse underscore/space/hyphen variations of a lowercased site name."""
+    return site_name.translate(NORM_TABLE)
+
+
+def fuzzy_lookup(site_normalized: str, choices: list[str]) -> tuple[int, float] | None:
+    """Return (index in choices, score) of the clear best match to site_normalized, or None.
+
+    choices must already be run through rapidfuzz.utils.default_process;
+    the query is processed the same way here. Callers should only apply
+    matches scoring FUZZY_APPLY_SCORE.
+
+    >>> fuzzy_lookup('kolam_mitak', ['mitak kolam', 'mitak'])
+    (0, 100.0)
+    >>> index, score = fuzzy_lookup('kampung-baru', ['kampung biru'])
+    >>> score >= FUZZY_APPLY_SCORE  # near miss: printed for review, never applied
+    False
+    >>> fuzzy_lookup('sungai-raya', ['sungai rasa', 'sungai raja']) is None  # no clear winner
+    True
+    >>> fuzzy_lookup('menarbux', ['menarbu']) is None
+    True
+    """
+    query = utils.default_process(site_normalized)
+    cutoff = FUZZY_CUTOFF if len(query) >= FUZZY_SHORT_LEN else FUZZY_SHORT_CUTOFF
+    matches = process.extract(query, choices, scorer=fuzz.token_sort_ratio,
+                              processor=None, score_cutoff=cutoff, limit=2)
+    if not matches:
+        return None
+    best, score, index = matches[0]
+    if len(matches) > 1 and score - matches[1][1] < FUZZY_MARGIN:
+        return None
+    if DIGITS_RX.findall(best) != DIGITS_RX.findall(query):
+        return None
+    return index, score
+
+
+def parse_date_str(talis_date_str: str) -> str | None:
+    """Parse a free-form date string (e.g. "6 sept 2025") to YYYY-MM-DD, or None.
+
+    ISO strings keep year-month-day order; other numeric dates are day-first.
+
+    >>> [parse_date_str(s) for s in ['2025-01-05', '2025-01-05 00:00:00', '05/01/2025', '05-01-2025']]
+    ['2025-01-05', '2025-01-05', '2025-01-05', '2025-01-05']
+    >>> [parse_date_str(s) for s in ['2025-10-6', '2025-1-5', '2025-1-5 00:00:00']]
+    ['2025-10-06', '2025-01-05', '2025-01-05']
+    >>> parse_date_str('45936') is None
+    True
+    """
+    talis_date_str = talis_date_str.strip()
+
+    # Only try the formats whose shape fits (ISO first, the common case), so
+    # strptime is rarely left to raise and unwind on a mismatch
+    if ISO_PREFIX_RX.match(talis_date_str):
+        date_formats = [
+            '%Y-%m-%d %H:%M:%S',              # 2025-10-06 00:00:00
+            '%Y-%m-%d',                       # 2025-10-06, 2025-10-6
+        ]
+    elif '/' in talis_date_str:
+        date_formats = ['%d/%m/%Y']           # 06/10/2025
+    elif '-' in talis_date_str:
+        date_formats = ['%d-%m-%Y']           # 06-10-2025
+    elif any(c.isalpha() for c in talis_date_str):
+        date_formats = [
+            '%d %B %Y',                       # 6 September 2025
+            '%d %b %Y',                       # 12 Dec 2024
+        ]
+    else:
+        return None
+
+    for fmt in date_formats:
         try:
-            df_sheet = pd.read_excel(excel_file, sheet_name=sheet_name, header=1)
-            print(f"\nColumns in {sheet_name}:")
-            print(df_sheet.columns.tolist())
-            
-            for col in df_sheet.columns:
-                col_str = str(col).lower().replace('\n', ' ').replace('\r', ' ')
-                if 'done instal' in col_str and 'talis' in col_str:
-                    talis_col = col
-                if 'nama site' in col_str or ('site' in col_str and 'name' in col_str):
-                    site_name_col = col
-            
-            if talis_col and site_name_col:
-                df = df_sheet
-                break
-        except:
+            dt = datetime.strptime(talis_date_str, fmt)
+            return dt.strftime('%Y-%m-%d')
+        except ValueError:
             continue
 
-if talis_col and site_name_col:
+    # Try to extract date from string like "6 sept 2025"
+    date_match = DATE_RX.search(talis_date_str)
+    if date_match:
+        day, month_str, year = date_match.groups()
+        month_str = month_str.lower()
+        month = MONTH_MAP.get(month_str) or MONTH_MAP.get(month_str[:3])
+        if month:
+            try:
+                dt = datetime(int(year), month, int(day))
+                return dt.strftime('%Y-%m-%d')
+            except ValueError:  # e.g. 31 sept
+                pass
+
+    return None
+
+
+def find_columns(columns: pd.Index) -> tuple:
+    """Return (talis_col, site_name_col) detected from a sheet's columns, None where missing.
+
+    When several headers match, the last one wins.
+    """
+    cols_norm = [NEWLINE_RX.sub(' ', str(col)).lower() for col in columns]
+    last_first = list(zip(columns, cols_norm))[::-1]
+    talis_col = next((col for col, col_norm in last_first if TALIS_COL_RX.search(col_norm)), None)
+    site_name_col = next((col for col, col_norm in last_first if SITE_COL_RX.search(col_norm)), None)
+    return talis_col, site_name_col
+
+
+def build_map(df: pd.DataFrame, site_col, talis_col, keep: str = 'last') -> dict[str, str]:
+    """Map lowercased site name -> talis install date (YYYY-MM-DD) for one sheet.
+
+    keep picks which row wins when a site repeats: 'last' or 'first'.
+
+    >>> build_map(pd.DataFrame({'site': ['a', 'b', 'c'],
+    ...                         'talis': ['2025-10-06', '06/10/2025', '6 sept 2025']}), 'site', 'talis')
+    {'a': '2025-10-06', 'b': '2025-10-06', 'c': '2025-09-06'}
+    """
+    # Drop blank rows (sheets carry large empty trailing regions) up front
+    df = df.dropna(subset=[site_col, talis_col])
+
+    # Placeholder cells ("nan", "none", "") carry no data either
+    site_names = df[site_col].astype(str).str.strip().str.lower()
+    mask = ~site_names.isin(SENTINELS) & ~df[talis_col].astype(str).str.strip().str.lower().isin(SENTINELS)
+
+    # Sheets repeat a site across many rows; keep only one date cell per site
+    # so each unique site is parsed at most once
+    grouped = df.loc[mask, talis_col].groupby(site_names[mask], sort=False)
+    talis_raw = grouped.first() if keep == 'first' else grouped.last()
+
+    # Dispatch on the column dtype once: a datetime64 column is formatted
+    # directly. Otherwise only real datetime cells are vectorized; string
+    # cells (ISO dates would get day/month swapped by pandas' dayfirst
+    # parsing) and numbers (Excel serials would be read as epoch offsets)
+    # go through the shape-guarded parse_date_str
+    if is_datetime64_any_dtype(talis_raw):
+        talis_dates = talis_raw.dt.strftime('%Y-%m-%d')
+    else:
+        talis_dates = pd.Series(None, index=talis_raw.index, dtype=object)
+        is_datetime = talis_raw.map(lambda value: isinstance(value, date))
+        if is_datetime.any():
+            talis_dates[is_datetime] = pd.to_datetime(talis_raw[is_datetime]).dt.strftime('%Y-%m-%d')
+        if not is_datetime.all():
+            talis_dates[~is_datetime] = talis_raw[~is_datetime].astype(str).map(parse_date_str)
+
+    return talis_dates.dropna().to_dict()
+
+
+def write_json_records(json_file: str, records: list[dict]) -> None:
+    """Write records as a 2-space indented JSON array, serializing one record at a time.
+
+    Output is byte-identical to orjson.dumps(records, option=OPT_INDENT_2),
+    but only one serialized record is held in memory at once. orjson writes
+    UTF-8 as-is, matching json.dump(..., ensure_ascii=False).
+    """
+    with open(json_file, 'wb') as f:
+        f.write(b'[')
+        for i, record in enumerate(records):
+            f.write(b',\n  ' if i else b'\n  ')
+            # JSON strings never contain raw newlines, so this only re-indents
+            f.write(orjson.dumps(record, option=orjson.OPT_INDENT_2).replace(b'\n', b'\n  '))
+        f.write(b'\n]' if records else b']')
+
+
+def read_sheet(excel_file: str, sheet_name: str, header_row: int) -> pd.DataFrame | None:
+    """Parse one sheet with header_row as its header, or None if the workbook lacks it."""
+    with pd.ExcelFile(excel_file, engine=EXCEL_ENGINE) as xls:
+        if sheet_name not in xls.sheet_names:
+            return None
+        return pd.read_excel(xls, sheet_name=sheet_name, header=header_row)
+
+
+def read_workbook(excel_file: str, sheet_headers: dict[str, int], jobs: int = 1,
+                  cache_dir: str = '.cache') -> dict[str, pd.DataFrame]:
+    """Return {sheet_name: DataFrame} for the sheets in sheet_headers.
+
+    Each sheet is read with header= set to its header row, so pandas names
+    the columns (deduplicating repeats, labelling blanks "Unnamed: n").
+    With jobs=1 the workbook is opened once and one read_excel call is made
+    per distinct header row; with jobs > 1 each sheet is parsed by its own
+    worker (see read_sheet). Sheets missing from the file are left out.
+    Parsed sheets are pickled under cache_dir keyed by the MD5 of the Excel
+    file, the sheets/header rows and the engine, so re-runs against an
+    unchanged workbook skip read_excel entirely; only the latest pickle is
+    kept. A pickle that can't be loaded (e.g. written by another pandas
+    version) is re-parsed.
+    """
+    digest = hashlib.md5()
+    with open(excel_file, 'rb') as f:
+        digest.update(f.read())
+    digest.update('|'.join([EXCEL_ENGINE, *(f'{name}:{row}' for name, row in sheet_headers.items())]).encode())
+    cache_path = os.path.join(cache_dir, f'{CACHE_PREFIX}{digest.hexdigest()}.pkl')
+
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_pickle(cache_path)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError) as e:
+            print(f"Ignoring unreadable cache {cache_path}: {e}")
+
+    if jobs > 1:
+        # Each worker opens the workbook itself. openpyxl parses in pure Python
+        # and would hold the GIL, so it gets processes; calamine gets threads
+        executor_class = ProcessPoolExecutor if EXCEL_ENGINE == 'openpyxl' else ThreadPoolExecutor
+        names = list(sheet_headers)
+        with executor_class(max_workers=jobs) as executor:
+            results = executor.map(read_sheet, [excel_file] * len(names), names,
+                                   [sheet_headers[name] for name in names])
+            sheets = {name: df for name, df in zip(names, results) if df is not None}
+    else:
+        with pd.ExcelFile(excel_file, engine=EXCEL_ENGINE) as xls:
+            available = [name for name in sheet_headers if name in xls.sheet_names]
+            sheets = {}
+            for header_row in dict.fromkeys(sheet_headers[name] for name in available):
+                names = [name for name in available if sheet_headers[name] == header_row]
+                sheets.update(pd.read_excel(xls, sheet_name=names, header=header_row))
+        sheets = {name: sheets[name] for name in available}
+
+    # Write to a temp file and rename it into place so an interrupted run never
+    # leaves a truncated pickle, then drop the caches of older workbook versions
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    os.close(fd)
+    try:
+        pd.to_pickle(sheets, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    for old_path in glob.glob(os.path.join(cache_dir, f'{CACHE_PREFIX}*.pkl')):
+        if old_path != cache_path:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+    return sheets
+
+
+def main(excel_file: str, json_file: str, jobs: int = 1) -> None:
+    """Fill talis_installed in json_file from the talis install dates in excel_file."""
+    # Parse the needed sheets once (or load them from the pickle cache);
+    # every later step reuses these frames
+    frames = read_workbook(excel_file, SHEET_HEADERS, jobs=jobs)
+
+    df = frames['SLA']
+
+    print("Columns found:")
+    print(df.columns.tolist())
+
+    # Find the columns
+    talis_col, site_name_col = find_columns(df.columns)
+
+    print(f"\nTalis column: {talis_col}")
+    print(f"Site name column: {site_name_col}")
+
+    if not talis_col or not site_name_col:
+        print("\nTrying other sheets...")
+        # Try Talis Full and Talis Mix sheets
+        for sheet_name in ['Talis Full', 'Talis Mix']:
+            try:
+                df_sheet = frames[sheet_name]
+                print(f"\nColumns in {sheet_name}:")
+                print(df_sheet.columns.tolist())
+
+                talis_col, site_name_col = find_columns(df_sheet.columns)
+                if talis_col and site_name_col:
+                    df = df_sheet
+                    break
+            except KeyError:  # sheet not in workbook
+                continue
+
+    if not talis_col or not site_name_col:
+        print("\nERROR: Could not find required columns in Excel file")
+        print("Please check the Excel file structure")
+        return
+
     print(f"\nUsing columns: {site_name_col} -> {talis_col}")
-    
+
     # Create mapping from site_name to talis_installed date
-    talis_map = {}
-    
-    for idx, row in df.iterrows():
-        site_name = str(row[site_name_col]).strip() if pd.notna(row[site_name_col]) else None
-        talis_date = row[talis_col]
-        
-        if site_name and pd.notna(talis_date) and str(talis_date).strip().lower() not in ['nan', 'none', '']:
-            # Convert date to string format YYYY-MM-DD
-            talis_date_str = None
-            
-            if isinstance(talis_date, datetime):
-                talis_date_str = talis_date.strftime('%Y-%m-%d')
-            elif isinstance(talis_date, pd.Timestamp):
-                talis_date_str = talis_date.strftime('%Y-%m-%d')
-            else:
-                # Try to parse as date string
-                talis_date_str = str(talis_date).strip()
-                
-                # Try to convert various date formats
-                date_formats = [
-                    '%Y-%m-%d %H:%M:%S',  # 2025-10-06 00:00:00
-                    '%Y-%m-%d',            # 2025-10-06
-                    '%d %B %Y',           # 12 December 2024
-                    '%d %b %Y',           # 12 Dec 2024
-                    '%d/%m/%Y',           # 06/10/2025
-                    '%d-%m-%Y',           # 06-10-2025
-                    '%d %B %Y',           # 6 September 2025
-                    '%d %b %Y',           # 6 sept 2025
-                ]
-                
-                parsed = False
-                for fmt in date_formats:
-                    try:
-                        dt = datetime.strptime(talis_date_str, fmt)
-                        talis_date_str = dt.strftime('%Y-%m-%d')
-                        parsed = True
-                        break
-                    except:
-                        continue
-                
-                if not parsed:
-                    # Try to extract date from string like "6 sept 2025"
-                    date_match = re.search(r'(\d{1,2})\s+([a-zA-Z]+)\s+(\d{4})', talis_date_str, re.IGNORECASE)
-                    if date_match:
-                        day, month_str, year = date_match.groups()
-                        month_map = {
-                            'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
-                            'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
-                            'januari': 1, 'februari': 2, 'maret': 3, 'april': 4, 'mei': 5, 'juni': 6,
-                            'juli': 7, 'agustus': 8, 'september': 9, 'oktober': 10, 'november': 11, 'desember': 12
-                        }
-                        month = month_map.get(month_str.lower()[:3], None)
-                        if month:
-                            try:
-                                dt = datetime(int(year), month, int(day))
-                                talis_date_str = dt.strftime('%Y-%m-%d')
-                                parsed = True
-                            except:
-                                pass
-            
-            if talis_date_str:
-                # Normalize site name for matching
-                site_name_normalized = site_name.lower().strip()
-                talis_map[site_name_normalized] = talis_date_str
-                if len(talis_map) <= 10:  # Print first 10 mappings
-                    print(f"  {site_name_normalized} -> {talis_date_str}")
-    
+    talis_map = build_map(df, site_name_col, talis_col)
+    for site_name_normalized, talis_date_str in list(talis_map.items())[:10]:  # Print first 10 mappings
+        print(f"  {site_name_normalized} -> {talis_date_str}")
+
     print(f"\nTotal mappings created: {len(talis_map)}")
-    
-    # Also read from other sheets if available
+
+    # Also read from other sheets if available. Only sites not already mapped
+    # are added, so the sheet above (normally SLA) beats Talis Full, which
+    # beats Talis Mix, and within these sheets a site's first row wins
     for sheet_name in ['Talis Full', 'Talis Mix']:
         try:
-            df_sheet = pd.read_excel(excel_file, sheet_name=sheet_name, header=1)
-            for idx, row in df_sheet.iterrows():
-                site_name = str(row[site_name_col]).strip() if pd.notna(row[site_name_col]) else None
-                talis_date = row[talis_col]
-                
-                if site_name and pd.notna(talis_date) and str(talis_date).strip().lower() not in ['nan', 'none', '']:
-                    site_name_normalized = site_name.lower().strip()
-                    # Only add if not already in map (prioritize SLA sheet)
-                    if site_name_normalized not in talis_map:
-                        # Convert date
-                        if isinstance(talis_date, datetime):
-                            talis_date_str = talis_date.strftime('%Y-%m-%d')
-                        elif isinstance(talis_date, pd.Timestamp):
-                            talis_date_str = talis_date.strftime('%Y-%m-%d')
-                        else:
-                            talis_date_str = str(talis_date).strip()
-                            # Try parsing
-                            for fmt in ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d %B %Y', '%d %b %Y', '%d/%m/%Y', '%d-%m-%Y']:
-                                try:
-                                    dt = datetime.strptime(talis_date_str, fmt)
-                                    talis_date_str = dt.strftime('%Y-%m-%d')
-                                    break
-                                except:
-                                    continue
-                        
-                        if talis_date_str and talis_date_str not in ['nan', 'none', '']:
-                            talis_map[site_name_normalized] = talis_date_str
-        except:
+            sheet_map = build_map(frames[sheet_name], site_name_col, talis_col, keep='first')
+        except KeyError:  # sheet, or one of the columns, not in workbook
             continue
-    
+        for site_name_normalized, talis_date_str in sheet_map.items():
+            talis_map.setdefault(site_name_normalized, talis_date_str)
+
     print(f"Total mappings after reading all sheets: {len(talis_map)}")
-    
+
     # Read JSON file
-    json_file = 'newDatas.json'
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    # Update talis_installed field
-    updated_count = 0
-    not_found = []
-    
-    for item in data:
-        site_name = item.get('site_name', '').strip().lower()
-        
-        # Try exact match first
-        if site_name in talis_map:
-            item['talis_installed'] = talis_map[site_name]
-            updated_count += 1
+    with open(json_file, 'rb') as f:
+        data = orjson.loads(f.read())
+
+    # Index talis_map by normalized key (underscores/spaces -> hyphens) once,
+    # so the fallback match below is a single dict lookup per JSON record.
+    # When keys collide (e.g. "a b" and "a_b") the first one in talis_map wins
+    talis_map_norm = {}
+    for key, value in talis_map.items():
+        talis_map_norm.setdefault(normalize_name(key), value)
+
+    # Look up every record at once: exact match first, then the variation
+    # with underscores/spaces normalized to hyphens
+    site_names = pd.Series([item.get('site_name', '') for item in data], dtype=object).str.strip().str.lower()
+    site_names_normalized = site_names.str.translate(NORM_TABLE)
+    talis_dates = site_names.map(talis_map).fillna(site_names_normalized.map(talis_map_norm))
+    found = talis_dates.notna()
+
+    # Last resort for the names still unmatched: fuzzy-match them against the
+    # normalized keys. Only exact token matches are applied; weaker candidates
+    # are printed for review
+    choices = list(talis_map_norm)
+    processed_choices = [utils.default_process(choice) for choice in choices]
+    for i in found.index[~found]:
+        site_normalized = site_names_normalized[i]
+        if not isinstance(site_normalized, str):
+            continue
+        match = fuzzy_lookup(site_normalized, processed_choices)
+        if match is None:
+            continue
+        index, score = match
+        if score >= FUZZY_APPLY_SCORE:
+            talis_dates[i] = talis_map_norm[choices[index]]
+            print(f"  fuzzy match: {site_names[i]} -> {choices[index]}")
         else:
-            # Try to find with variations (underscores, hyphens, spaces)
-            found = False
-            for key in talis_map.keys():
-                # Normalize both for comparison
-                key_normalized = key.replace('_', '-').replace(' ', '-')
-                site_normalized = site_name.replace('_', '-').replace(' ', '-')
-                
-                if key_normalized == site_normalized:
-                    item['talis_installed'] = talis_map[key]
-                    updated_count += 1
-                    found = True
-                    break
-            
-            if not found:
-                not_found.append(site_name)
-    
+            print(f"  fuzzy candidate (not applied, please review): {site_names[i]} -> {choices[index]} ({score:.0f})")
+    found = talis_dates.notna()
+
+    # Update talis_installed field in place; round-tripping data through a
+    # DataFrame would turn nullable int fields into floats
+    for i, talis_date_str in talis_dates[found].items():
+        data[i]['talis_installed'] = talis_date_str
+
+    updated_count = int(found.sum())
+    not_found = site_names[~found].tolist()
+
     print(f"\nUpdated {updated_count} records")
     if not_found:
         print(f"\nSites not found in Excel (first 20): {not_found[:20]}")
         print(f"Total not found: {len(not_found)}")
-    
+
     # Write updated JSON
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    
+    write_json_records(json_file, data)
+
     print(f"\nUpdated {json_file} successfully!")
-else:
-    print("\nERROR: Could not find required columns in Excel file")
-    print("Please check the Excel file structure")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fill talis_installed in newDatas.json from the SLA workbook')
+    parser.add_argument('--jobs', type=int, default=1, help='number of workers used to parse the workbook sheets')
+    args = parser.parse_args()
+
+    main('SLA DES 2025.xlsx', 'newDatas.json', jobs=args.jobs)